@@ -15,16 +15,19 @@ class FAS():
     Note meshes[kcoarse],...,meshes[kfine] are the mesh levels.
 
     The key problem-specific solver components are the nonlinear operator
-    prob.F() and the NGS method prob.ngspoint().  The coarse correction uses
-    prob.F() to build the right-hand side linear functional.  The NGS method
-    is used for both the smoother and the coarse-level solver.  Key
-    MeshLevel1D components are meshes[k].Rfw() (full-weighting) or
-    meshes[k].Rinj() (injection) restriction of vectors, meshes[k].CR()
-    for canonical restriction of linear functionals, and meshes[k].P()
-    for prolongation of vectors.
+    prob.F() and the NGS method prob.ngspoint(), which is also applied in
+    sweeps by prob.ngssweep() and at non-adjacent points by
+    prob.ngspointvec().  The coarse correction uses prob.F() to build the
+    right-hand side linear functional.  The NGS method is used for both the
+    smoother and the coarse-level solver.  Key MeshLevel1D components are
+    meshes[k].Rfw() (full-weighting) or meshes[k].Rinj() (injection)
+    restriction of vectors, meshes[k].CR() for canonical restriction of
+    linear functionals, and meshes[k].P() for prolongation of vectors.
 
     This class implements three main solver methods:
-      ngssweep():  repeatedly call prob.ngspoint()
+      ngssweep():  repeatedly call prob.ngspoint(), via prob.ngssweep(),
+                   or with redblack=True call prob.ngspointvec() on each
+                   color
       vcycle():    do FAS V-cycle, calling ngssweep() for down- and up-
                    smoother, and coarsesolve() at bottom
       fcycle():    do FAS F-cycle with one V-cycle per level on the
@@ -38,7 +41,8 @@ class FAS():
 
     def __init__(self, meshes, prob, kcoarse, kfine,
                  mms=False, solutionR='fw',
-                 coarse=1, down=1, up=1, niters=2,
+                 coarse=1, coarsertol=0.0, down=1, up=1, niters=2,
+                 redblack=False,
                  monitor=False, monitorupdate=False):
         self.meshes = meshes
         self.prob = prob
@@ -49,17 +53,31 @@ class FAS():
         self.kcoarse = kcoarse
         self.kfine = kfine
         self.coarse = coarse
+        self.coarsertol = coarsertol
         self.down = down
         self.up = up
         self.niters = niters
+        self.redblack = redblack
         self.monitor = monitor
         self.monitorupdate = monitorupdate
         self.wu = np.zeros(self.kfine + 1)
+        # work vectors for vcycle(), allocated once; in scratch[k], Fu
+        # lives on mesh k and the others on the mesh coarser than k
+        self.scratch = [None] * (self.kfine + 1)
+        for k in range(self.kcoarse + 1, self.kfine + 1):
+            n = self.meshes[k].mcoarser + 1
+            self.scratch[k] = {'Fu': np.empty(self.meshes[k].m + 1),
+                               'Ru': np.empty(n), 'FRu': np.empty(n),
+                               'ellcoarse': np.empty(n), 'ucoarse': np.empty(n),
+                               'duc': np.empty(n)}
+        self.rhscache = {}
 
     # return L^2 norm of residual r = ell - F(w) on k level mesh
     def residualnorm(self, k, w, ell):
         mesh = self.meshes[k]
-        return mesh.l2norm(ell - self.prob.F(mesh.h, w))
+        r = self.prob.F(mesh.h, w)
+        np.subtract(ell, r, out=r)
+        return mesh.l2norm(r)
 
     # on monitor flag, indented-print residual norm
     def printresidualnorm(self, s, k, w, ell):
@@ -85,37 +103,67 @@ class FAS():
     # enhanced prolongation for F-cycle
     #     input w is on k-1 mesh; output is on k mesh
     def Phat(self, k, w, ell):
-        w = self.meshes[k].P(w)  # use linear interpolation
-        for p in range(1, self.meshes[k].m, 2):  # fix odd points only
-            self.prob.ngspoint(self.meshes[k].h, w, ell, p, niters=self.niters)
+        mesh = self.meshes[k]
+        w = mesh.P(w)  # use linear interpolation
+        # fix odd points only; their neighbors are even so do all at once
+        w[1::2] = self.prob.ngspointvec(mesh.h, w[1::2], w[0:-1:2], w[2::2],
+                                        ell[1::2], niters=self.niters)
         return w
 
-    # compute right-hand side, a linear functional, from function g(x)
+    # compute right-hand side, a linear functional, from function g(x);
+    #     computed once per level and cached, so callers must not modify it
     def rhs(self, k):
-        ellg = self.meshes[k].zeros()
-        if self.mms:
-            _, g = self.prob.mms(self.meshes[k].xx())
-            g *= self.meshes[k].h
-            ellg[1:-1] = g[1:-1]
-        return ellg
+        if k not in self.rhscache:
+            ellg = self.meshes[k].zeros()
+            if self.mms:
+                _, g = self.prob.mms(self.meshes[k].xx())
+                g *= self.meshes[k].h
+                ellg[1:-1] = g[1:-1]
+            self.rhscache[k] = ellg
+        return self.rhscache[k]
 
     # sweep through mesh applying NGS at each point
-    def ngssweep(self, k, w, ell, forward=True):
-        '''Do one in-place nonlinear Gauss-Seidel (NGS) sweep on vector w
-        over the interior points p=1,...,m-1 in either forward order (default)
-        or backward order.'''
+    def ngssweep(self, k, w, ell, forward=True, sweeps=1, Fw=None):
+        '''Do in-place nonlinear Gauss-Seidel (NGS) sweeps, one by default,
+        on vector w over the interior points p=1,...,m-1 in either forward
+        order (default) or backward order.  If Fw is given then it is
+        filled with F(w) for the smoothed w.  With redblack=True each sweep
+        instead updates all even points at once, using prob.ngspointvec(),
+        and then all odd points, or odd then even if backward.  The
+        down-smoother starts with even points because in the F-cycle
+        Phat() has just updated the odd points.'''
+        h = self.meshes[k].h
+        if not self.redblack:
+            self.prob.ngssweep(h, w, ell, forward=forward,
+                               niters=self.niters, sweeps=sweeps, Fw=Fw)
+            return
         if forward:
-            indices = range(1, self.meshes[k].m)
+            colors = (2, 1)
         else:
-            indices = range(self.meshes[k].m - 1, 0, -1)
-        for p in indices:
-            self.prob.ngspoint(self.meshes[k].h, w, ell, p, niters=self.niters)
+            colors = (1, 2)
+        for _ in range(sweeps):
+            for c in colors:
+                w[c:-1:2] = self.prob.ngspointvec(h, w[c:-1:2], w[c-1:-2:2],
+                                                  w[c+1::2], ell[c:-1:2],
+                                                  niters=self.niters)
+        if Fw is not None:
+            self.prob.F(h, w, out=Fw)
 
-    # solve coarsest problem by NGS sweeps; acts in-place on u
+    # solve coarsest problem by NGS sweeps; acts in-place on u;
+    #     if coarsertol > 0 then stop early on residual norm reduction
+    #     by that factor
     def coarsesolve(self, u, ell):
-        for _ in range(self.coarse):
-            self.ngssweep(self.kcoarse, u, ell)
-        self.wu[self.kcoarse] += self.coarse
+        if self.coarsertol > 0.0:
+            rnorm0 = self.residualnorm(self.kcoarse, u, ell)
+            for _ in range(self.coarse):
+                self.ngssweep(self.kcoarse, u, ell)
+                self.wu[self.kcoarse] += 1
+                rnorm = self.residualnorm(self.kcoarse, u, ell)
+                if rnorm <= self.coarsertol * rnorm0:
+                    break
+        else:
+            self.ngssweep(self.kcoarse, u, ell, sweeps=self.coarse)
+            self.wu[self.kcoarse] += self.coarse
 
     # recursive FAS V-cycle for levels k down to k=kcoarse; acts in-place on u
     def vcycle(self, k, u, ell):
@@ -123,31 +171,34 @@ class FAS():
             self.coarsesolve(u, ell)
         else:
             assert k > self.kcoarse
-            # smooth: NGS sweeps on fine mesh
-            for _ in range(self.down):
-                self.ngssweep(k, u, ell)
+            mesh, meshc = self.meshes[k], self.meshes[k - 1]
+            F = self.prob.F
+            work = self.scratch[k]
+            # smooth: NGS sweeps on fine mesh, also getting F^h(u^h)
+            self.ngssweep(k, u, ell, sweeps=self.down, Fw=work['Fu'])
             self.wu[k] += self.down
             # restrict down using  ell = R' (f^h - F^h(u^h)) + F^{2h}(R u^h)
-            rfine = ell - self.prob.F(self.meshes[k].h, u)
+            Ru = work['Ru']
             if self.solutionR == 'inj':
-                Ru = self.meshes[k].Rinj(u)
+                np.copyto(Ru, mesh.Rinj(u))
             else:
-                Ru = self.meshes[k].Rfw(u)
-            coarseell = self.meshes[k].CR(
-                rfine) + self.prob.F(self.meshes[k - 1].h, Ru)
+                mesh.Rfw(u, out=Ru)
+            coarseell = mesh.CRresidual(ell, work['Fu'], out=work['ellcoarse'])
+            coarseell += F(meshc.h, Ru, out=work['FRu'])
             # recurse
-            ucoarse = Ru.copy()
+            ucoarse = work['ucoarse']
+            np.copyto(ucoarse, Ru)
             self.vcycle(k - 1, ucoarse, coarseell)
-            duc = ucoarse - Ru
+            duc = np.subtract(ucoarse, Ru, out=work['duc'])
             self.printupdatenorm(k, duc)
             # correct by prolongation of update:  u <- u + P(u^{2h} - R u^h)
-            u += self.meshes[k].P(duc)
+            mesh.Padd(duc, u)
             # smooth: NGS sweeps on fine mesh
-            for _ in range(self.up):
-                self.ngssweep(k, u, ell, forward=False)
+            self.ngssweep(k, u, ell, forward=False, sweeps=self.up)
             self.wu[k] += self.up
 
-    # unrolled FAS V-cycle for levels k=ktop down to k=kcoarse; acts in-place on u
+    # unrolled FAS V-cycle for levels k=ktop down to k=kcoarse; acts in-place on u;
+    #     same as vcycle() but iterative, so no recursion overhead
     def vcycleunroll(self, ktop, u, ell):
         #print('UNROLL!')
         if ktop == self.kcoarse:
@@ -156,42 +207,49 @@ class FAS():
             assert ktop > self.kcoarse
             self.meshes[ktop].u = u  # attach current iterate and ell to mesh; do NOT copy
             self.meshes[ktop].ell = ell
+            F = self.prob.F
             # downward
             for k in range(ktop,self.kcoarse,-1):
-                # smooth: NGS sweeps
-                for _ in range(self.down):
-                    self.ngssweep(k, self.meshes[k].u, self.meshes[k].ell)
+                mesh, meshc = self.meshes[k], self.meshes[k-1]
+                # smooth: NGS sweeps, also getting F^h(u^h)
+                self.ngssweep(k, mesh.u, mesh.ell, sweeps=self.down,
+                              Fw=self.scratch[k]['Fu'])
                 self.wu[k] += self.down
                 # restrict down using  ell = R' (f^h - F^h(u^h)) + F^{2h}(R u^h)
-                rfine = self.meshes[k].ell \
-                        - self.prob.F(self.meshes[k].h, self.meshes[k].u)
+                meshc.Ru = self.scratch[k]['Ru']  # reuse work vectors
                 if self.solutionR == 'inj':
-                    self.meshes[k-1].Ru = self.meshes[k].Rinj(self.meshes[k].u)
+                    np.copyto(meshc.Ru, mesh.Rinj(mesh.u))
                 else:
-                    self.meshes[k-1].Ru = self.meshes[k].Rfw(self.meshes[k].u)
-                self.meshes[k-1].ell = self.meshes[k].CR(rfine) \
-                                       + self.prob.F(self.meshes[k-1].h, self.meshes[k-1].Ru)
-                self.meshes[k-1].u = self.meshes[k-1].Ru.copy()  # copy necessary
+                    mesh.Rfw(mesh.u, out=meshc.Ru)
+                meshc.ell = mesh.CRresidual(mesh.ell, self.scratch[k]['Fu'],
+                                            out=self.scratch[k]['ellcoarse'])
+                meshc.ell += F(meshc.h, meshc.Ru, out=self.scratch[k]['FRu'])
+                meshc.u = self.scratch[k]['ucoarse']
+                np.copyto(meshc.u, meshc.Ru)  # copy necessary
             # coarse solve
             self.coarsesolve(self.meshes[self.kcoarse].u, self.meshes[self.kcoarse].ell)
             # upward
             for k in range(self.kcoarse+1,ktop+1):
-                duc = self.meshes[k-1].u - self.meshes[k-1].Ru
+                mesh, meshc = self.meshes[k], self.meshes[k-1]
+                duc = np.subtract(meshc.u, meshc.Ru, out=self.scratch[k]['duc'])
                 self.printupdatenorm(k, duc)
                 # correct by prolongation of update:  u <- u + P(u^{2h} - R u^h)
-                self.meshes[k].u += self.meshes[k].P(duc)
+                mesh.Padd(duc, mesh.u)
                 # smooth: NGS sweeps
-                for _ in range(self.up):
-                    self.ngssweep(k, self.meshes[k].u, self.meshes[k].ell, forward=False)
+                self.ngssweep(k, mesh.u, mesh.ell, forward=False,
+                              sweeps=self.up)
                 self.wu[k] += self.up
 
     # FAS F-cycle for levels kcoarse up to kfine; returns u
     def fcycle(self, ep=True, unroll=False):
         u = self.meshes[self.kcoarse].zeros()
         ellg = self.rhs(self.kcoarse)
-        self.printresidualnorm(0, self.kcoarse, u, ellg)
+        # residual norms are only printed here, so skip them unless monitoring
+        if self.monitor:
+            self.printresidualnorm(0, self.kcoarse, u, ellg)
         self.coarsesolve(u, ellg)
-        self.printresidualnorm(1, self.kcoarse, u, ellg)
+        if self.monitor:
+            self.printresidualnorm(1, self.kcoarse, u, ellg)
         for k in range(self.kcoarse + 1, self.kfine + 1):
             ellg = self.rhs(k)
             if ep:  # enhanced prolongation
@@ -199,10 +257,12 @@ class FAS():
                 self.wu[k] += 0.5
             else:
                 u = self.meshes[k].P(u)
-            self.printresidualnorm(0, k, u, ellg)
+            if self.monitor:
+                self.printresidualnorm(0, k, u, ellg)
             if unroll:
                 self.vcycleunroll(k, u, ellg)
             else:
                 self.vcycle(k, u, ellg)
-            self.printresidualnorm(1, k, u, ellg)
+            if self.monitor:
+                self.printresidualnorm(1, k, u, ellg)
         return u
@@ -34,9 +34,12 @@ point.
 Both FAS V-cycles and F-cycles are implemented.  Note that F-cycles use
 V-cycles.  Set the number of cycles with -cycles.  One may set the number
 of down- and up-smoother NGS sweeps (-down,-up) and coarsest-mesh sweeps
-(-coarse).  One can revert to only using NGS sweeps on the fine mesh
-(-ngsonly), but then the user should set -cycle or -down to a large value
-in that case.
+(-coarse).  The coarsest-mesh sweeps can stop early, once the residual
+norm there is reduced by a factor -coarsertol.  One can revert to only
+using NGS sweeps on the fine mesh (-ngsonly), but then the user should set
+-cycle or -down to a large value in that case.  Option -redblack switches
+NGS to red-black ordering, updating all even nodes and then all odd nodes
+(odd then even in the up-smoother) with vectorized Newton iterations.
 
 Monitor the residual between V-cycles with -monitor, and perhaps with
 -monitorupdate.  Show the solution in Matplotlib graphics with -show.
@@ -47,6 +50,8 @@ For full documentation see ../doc/fas.pdf.
 ''', formatter_class=argparse.RawTextHelpFormatter)
 prs.add_argument('-coarse', type=int, default=1, metavar='N',
                  help='number of NGS sweeps on coarsest mesh (default=1)')
+prs.add_argument('-coarsertol', type=float, default=0.0, metavar='L',
+                 help='stop coarsest-mesh NGS sweeps on residual norm reduction by this factor (default=0.0: always do -coarse sweeps)')
 prs.add_argument('-cyclemax', type=int, default=100, metavar='Z',
                  help='maximum number of FAS V-cycles (default=100)')
 prs.add_argument('-down', type=int, default=1, metavar='N',
@@ -73,6 +78,8 @@ prs.add_argument('-niters', type=int, default=2, metavar='N',
                  help='Newton iterations in NGS smoothers (default=2)')
 prs.add_argument('-R', choices=['fw', 'inj'], metavar='X', default='fw',
                  help='choose solution restriction (default: %(default)s)')
+prs.add_argument('-redblack', action='store_true', default=False,
+                 help='use red-black ordering in NGS sweeps')
 prs.add_argument('-rtol', type=float, default=1.0e-4, metavar='L',
                  help='stop on residual norm reduction by this factor (default=1.0e-4)')
 prs.add_argument('-show', action='store_true', default=False,
@@ -108,8 +115,9 @@ prob = LiouvilleBratu1D(lam=args.lam)
 
 # initialize FAS and its parameters
 fas = FAS(meshes, prob, mms=args.mms, kcoarse=kcoarse, kfine=args.K,
-          coarse=args.coarse, down=args.down, up=args.up,
-          solutionR=args.R, niters=args.niters,
+          coarse=args.coarse, coarsertol=args.coarsertol,
+          down=args.down, up=args.up,
+          solutionR=args.R, niters=args.niters, redblack=args.redblack,
           monitor=args.monitor, monitorupdate=args.monitorupdate)
 
 # SOLVE
@@ -132,8 +140,7 @@ while s < args.cyclemax:
         if rnorm < args.rtol * rnorm0:
             break
     if args.ngsonly:
-        for q in range(args.down):
-            fas.ngssweep(args.K, uu, ellg)
+        fas.ngssweep(args.K, uu, ellg, sweeps=args.down)
         fas.wu[args.K] += args.down  # add into FAS work units array
     else:
         if args.unroll:
@@ -13,24 +13,29 @@ class MeshLevel1D(object):
     Note p=1,...,m-1 are interior nodes.  MeshLevel1D(k=0) is the coarse mesh
     with one interior node.  The MeshLevel1D object knows about zero vectors,
     L_2 norms, prolongation (k-1 to k), canonical restriction of linear
-    functionals (k to k-1), and ordinary restriction of functions (k to k-1)
-    by full-weighting.'''
+    functionals (k to k-1), including of residuals, and ordinary restriction
+    of functions (k to k-1) by full-weighting.'''
 
     def __init__(self, k):
         self.k = k
         self.m = 2**(self.k+1)
         self.mcoarser = 2**self.k
         self.h = 1.0 / self.m
+        self._xx = None
 
     def zeros(self):
         return np.zeros(self.m+1)
 
     def xx(self):
-        return np.linspace(0.0,1.0,self.m+1)
+        '''Node coordinates.  The array is built once and cached, so
+        callers should not modify it.'''
+        if self._xx is None:
+            self._xx = np.linspace(0.0,1.0,self.m+1)
+        return self._xx
 
     def l2norm(self, u):
         '''L^2[0,1] norm computed with trapezoid rule.'''
-        return np.sqrt(self.h * (0.5*u[0]*u[0] + np.sum(u[1:-1]*u[1:-1]) \
+        return np.sqrt(self.h * (0.5*u[0]*u[0] + np.dot(u[1:-1],u[1:-1]) \
                                  + 0.5*u[-1]*u[-1]))
 
     def P(self,v):
@@ -43,32 +48,71 @@ class MeshLevel1D(object):
                % (len(v),self.mcoarser+1)
         assert self.k > 0, \
                'cannot prolong from a mesh coarser than the coarsest mesh'
-        y = self.zeros()  # y[0]=y[m]=0
+        y = np.empty(self.m+1)  # every entry set below
+        y[0], y[-1] = 0.0, 0.0
         y[1] = 0.5 * v[1]
-        for q in range(1,self.mcoarser-1):
-            y[2*q] = v[q]
-            y[2*q+1] = 0.5 * (v[q] + v[q+1])
-        y[self.m-2] = v[self.mcoarser-1]
-        y[self.m-1] = 0.5 * v[self.mcoarser-1]
+        y[2:-1:2] = v[1:-1]
+        y[3:-2:2] = 0.5 * (v[1:-2] + v[2:-1])
+        y[-2] = 0.5 * v[-2]
         return y
 
-    def CR(self,v):
+    def Padd(self,v,u):
+        '''Add the prolongation of v, as computed by P(v), into u in-place,
+        without allocating P(v).'''
+        assert len(v) == self.mcoarser+1, \
+               'input vector v is of length %d (should be %d)' \
+               % (len(v),self.mcoarser+1)
+        assert len(u) == self.m+1, \
+               'input vector u is of length %d (should be %d)' % (len(u),self.m+1)
+        assert self.k > 0, \
+               'cannot prolong from a mesh coarser than the coarsest mesh'
+        u[1] += 0.5 * v[1]
+        u[2:-1:2] += v[1:-1]
+        u[3:-2:2] += 0.5 * (v[1:-2] + v[2:-1])
+        u[-2] += 0.5 * v[-2]
+
+    def CR(self,v,out=None):
         '''Restrict a linear functional v in S_k' on the current mesh to the
         next-coarser (k-1) mesh using "canonical restriction".  Only the
-        interior points are updated.'''
+        interior points are updated.  If out is given then the result is
+        written into it.'''
         assert len(v) == self.m+1, \
                'input vector v is of length %d (should be %d)' % (len(v),self.m+1)
         assert self.k > 0, \
                'cannot restrict to a mesh coarser than the coarsest mesh'
-        y = np.zeros(self.mcoarser+1)  # y[0]=y[mcoarser]=0
-        for q in range(1,self.mcoarser):
-            y[q] = 0.5 * v[2*q-1] + v[2*q] + 0.5 * v[2*q+1]
+        if out is None:
+            y = np.empty(self.mcoarser+1)  # every entry set below
+        else:
+            y = out
+        y[0], y[-1] = 0.0, 0.0
+        half = 0.5 * v[1::2]  # odd points; each is shared by two coarse points
+        y[1:-1] = v[2:-2:2] + half[:-1] + half[1:]
         return y
 
-    def Rfw(self,v):
+    def CRresidual(self,ell,Fw,out=None):
+        '''Canonical restriction of the residual linear functional
+        r = ell - Fw, i.e. CR(ell - Fw), but without forming r on the
+        current mesh.  If out is given then the result is written into it.'''
+        assert len(ell) == self.m+1 and len(Fw) == self.m+1, \
+               'input vectors must be of length %d' % (self.m+1)
+        assert self.k > 0, \
+               'cannot restrict to a mesh coarser than the coarsest mesh'
+        if out is None:
+            y = np.empty(self.mcoarser+1)  # every entry set below
+        else:
+            y = out
+        y[0], y[-1] = 0.0, 0.0
+        half = 0.5 * (ell[1::2] - Fw[1::2])  # see CR()
+        y[1:-1] = (ell[2:-2:2] - Fw[2:-2:2]) + half[:-1] + half[1:]
+        return y
+
+    def Rfw(self,v,out=None):
         '''Restrict a vector (function) v in S_k (the current mesh) to the
-        next-coarser (k-1) mesh by using full-weighting.'''
-        return 0.5 * self.CR(v)
+        next-coarser (k-1) mesh by using full-weighting.  If out is given
+        then the result is written into it.'''
+        y = self.CR(v,out=out)
+        y *= 0.5
+        return y
 
     def Rinj(self,v):
         '''Restrict a vector (function) v in S_k (the current mesh) to the
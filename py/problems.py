@@ -7,6 +7,15 @@ import warnings
 warnings.simplefilter("error")
 import sys
 
+# compile the NGS kernels below if Numba is available, else run them as Python
+try:
+    from numba import njit
+    compiled = True
+except ImportError:
+    compiled = False
+    def njit(*args, **kwargs):
+        return lambda f: f
+
 __all__ = ['LiouvilleBratu1D']
 
 class Problem1D(object):
@@ -16,12 +25,31 @@ class Problem1D(object):
     def __init__(self):
         pass
 
-    def F(self,h,w):
+    def F(self,h,w,out=None):
         return None
 
     def ngspoint(self,h,w,ell,p,niters=2):
         return None
 
+    def ngspointvec(self,h,w,wleft,wright,ell,niters=2):
+        return None
+
+    def ngssweep(self,h,w,ell,forward=True,niters=2,sweeps=1,Fw=None):
+        '''Do sweeps passes of ngspoint() over the interior points
+        p=1,...,m-1 in either forward order (default) or backward order.
+        If vector Fw is given then F(h,w) for the final w is written
+        into it.'''
+        m = len(w) - 1
+        if forward:
+            indices = range(1,m)
+        else:
+            indices = range(m-1,0,-1)
+        for _ in range(sweeps):
+            for p in indices:
+                self.ngspoint(h,w,ell,p,niters=niters)
+        if Fw is not None:
+            self.F(h,w,out=Fw)
+
     def mms(self,x):
         return None
 
@@ -37,7 +65,7 @@ class LiouvilleBratu1D(Problem1D):
     def __init__(self,lam):
         self.lam = lam
 
-    def F(self,h,w):
+    def F(self,h,w,out=None):
         '''Evaluate the weak form of the nonlinear operator
             F(w) = -w'' - lambda e^w,
         i.e.
@@ -45,16 +73,20 @@ class LiouvilleBratu1D(Problem1D):
         for v equal to the interior-point hat functions psi_p at p=1,...,m-1.
         The first integral is evaluated exactly.  The second integral is by
         the trapezoid rule.  Input w is a vector of length m+1 and the
-        returned vector F is the same length and satisfies F[0]=F[m]=0.'''
+        returned vector F is the same length and satisfies F[0]=F[m]=0.
+        If out is given then the result is written into it.'''
         m = len(w) - 1
-        FF = np.zeros(m+1)
-        for p in range(1,m):
-            try:
-                tmp = h * self.lam * np.exp(w[p])
-            except RuntimeWarning as err:
-                print("stopping on RuntimeWarning: {0}".format(err))
-                sys.exit(1)
-            FF[p] = (1.0/h) * (2.0*w[p] - w[p-1] - w[p+1]) - tmp
+        if out is None:
+            FF = np.empty(m+1)  # every entry set below
+        else:
+            FF = out
+        FF[0], FF[m] = 0.0, 0.0
+        try:
+            tmp = h * self.lam * np.exp(w[1:-1])
+        except RuntimeWarning as err:
+            print("stopping on RuntimeWarning: {0}".format(err))
+            sys.exit(1)
+        FF[1:-1] = (1.0/h) * (2.0*w[1:-1] - w[:-2] - w[2:]) - tmp
         return FF
 
     def ngspoint(self,h,w,ell,p,niters=2):
@@ -64,18 +96,66 @@ class LiouvilleBratu1D(Problem1D):
         at point p, where  r(w)[v] = ell[v] - F(w)[v]  is the residual for w.
         See F() for how the weak form is approximated.  niters Newton steps
         are done without line search:
-            c_{k+1} = c_k - f(c_k) / f'(c_k).'''
-        c = 0
+            c_{k+1} = c_k - f(c_k) / f'(c_k).
+        The arithmetic is in _bratupoint().'''
+        try:
+            _bratupoint(h,self.lam,w,ell,p,niters)
+        except RuntimeWarning as err:
+            print("stopping on RuntimeWarning: {0}".format(err))
+            sys.exit(1)
+        if not np.isfinite(w[p]):
+            print("stopping on non-finite value in NGS")
+            sys.exit(1)
+
+    def ngspointvec(self,h,w,wleft,wright,ell,niters=2):
+        '''Vectorized ngspoint() at a set of points no two of which are
+        neighbors, so they can be updated simultaneously.  Input arrays
+        w and ell hold values at the points, and wleft and wright hold
+        values at their left and right neighbors.  Returns the updated
+        values at the points.'''
+        c = np.zeros(len(w))
         for n in range(niters):
             try:
-                tmp = h * self.lam * np.exp(w[p]+c)
+                tmp = h * self.lam * np.exp(w+c)
             except RuntimeWarning as err:
                 print("stopping on RuntimeWarning: {0}".format(err))
                 sys.exit(1)
-            f = - (1.0/h) * (2.0*(w[p]+c) - w[p-1] - w[p+1]) + tmp + ell[p]
+            f = - (1.0/h) * (2.0*(w+c) - wleft - wright) + tmp + ell
             df = - 2.0/h + tmp
             c -= f / df
-        w[p] += c
+        return w + c
+
+    def ngssweep(self,h,w,ell,forward=True,niters=2,sweeps=1,Fw=None):
+        '''Do sweeps passes of ngspoint() over the interior points
+        p=1,...,m-1 in either forward order (default) or backward order.
+        If vector Fw is given then F(h,w) for the final w is written
+        into it.  Each order has its own kernel, _bratusweepfwd() or
+        _bratusweepbwd(), which is compiled, including the loop over sweeps,
+        when Numba is available.  In that case a forward sweep also
+        computes Fw during its last pass, in _bratusweepfwdF(), because
+        F at p-1 is final once w[p] is updated.  Compiled code does not
+        raise on overflow of e^w, so we check the result instead.'''
+        fused = compiled and Fw is not None and forward and sweeps > 0
+        try:
+            if fused:
+                _bratusweepfwdF(h,self.lam,w,ell,niters,sweeps,Fw)
+            elif forward:
+                _bratusweepfwd(h,self.lam,w,ell,niters,sweeps)
+            else:
+                _bratusweepbwd(h,self.lam,w,ell,niters,sweeps)
+        except RuntimeWarning as err:
+            print("stopping on RuntimeWarning: {0}".format(err))
+            sys.exit(1)
+        if fused:
+            if not np.all(np.isfinite(Fw)):  # also catches non-finite w
+                print("stopping on non-finite value in NGS sweep")
+                sys.exit(1)
+        else:
+            if not np.all(np.isfinite(w)):
+                print("stopping on non-finite value in NGS sweep")
+                sys.exit(1)
+            if Fw is not None:
+                self.F(h,w,out=Fw)
 
     def mms(self,x):
         '''Return exact solution u(x) and right-hand-side g(x) for the
@@ -88,3 +168,42 @@ class LiouvilleBratu1D(Problem1D):
             sys.exit(1)
         return u, g
 
+
+@njit(cache=True, error_model='numpy')
+def _bratupoint(h,lam,w,ell,p,niters):
+    '''Newton iterations for NGS at point p; see LiouvilleBratu1D.ngspoint().'''
+    c = 0.0
+    for n in range(niters):
+        tmp = h * lam * np.exp(w[p]+c)
+        f = - (1.0/h) * (2.0*(w[p]+c) - w[p-1] - w[p+1]) + tmp + ell[p]
+        df = - 2.0/h + tmp
+        c -= f / df
+    w[p] += c
+
+@njit(cache=True, error_model='numpy')
+def _bratusweepfwd(h,lam,w,ell,niters,sweeps):
+    '''Forward NGS sweeps for Liouville-Bratu, p=1,...,m-1.'''
+    for _ in range(sweeps):
+        for p in range(1,len(w)-1):
+            _bratupoint(h,lam,w,ell,p,niters)
+
+@njit(cache=True, error_model='numpy')
+def _bratusweepfwdF(h,lam,w,ell,niters,sweeps,Fw):
+    '''Forward NGS sweeps for Liouville-Bratu, also computing Fw = F(w) at
+    the end; see LiouvilleBratu1D.F().  Assumes sweeps > 0.'''
+    _bratusweepfwd(h,lam,w,ell,niters,sweeps-1)
+    m = len(w) - 1
+    for p in range(1,m+1):
+        if p < m:
+            _bratupoint(h,lam,w,ell,p,niters)
+        q = p - 1
+        if q > 0:
+            Fw[q] = (1.0/h) * (2.0*w[q] - w[q-1] - w[q+1]) - h * lam * np.exp(w[q])
+    Fw[0], Fw[m] = 0.0, 0.0
+
+@njit(cache=True, error_model='numpy')
+def _bratusweepbwd(h,lam,w,ell,niters,sweeps):
+    '''Backward NGS sweeps for Liouville-Bratu, p=m-1,...,1.'''
+    for _ in range(sweeps):
+        for p in range(len(w)-2,0,-1):
+            _bratupoint(h,lam,w,ell,p,niters)